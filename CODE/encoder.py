@@ -19,8 +19,32 @@ You must encode:
 """
 
 
-from typing import Tuple, Iterable
+from typing import List, Tuple, Iterable
 
+# Set to True to print encoding progress to stdout
+DEBUG = False
+
+
+def amo_seq(lits: List[int], next_aux: int) -> Tuple[List[List[int]], int]:
+    """
+    Sequential (Sinz) at-most-one over lits.
+
+    Uses k-1 auxiliary variables s_1..s_{k-1} numbered from next_aux, where
+    s_i means "one of x_1..x_i is true". Returns (clauses, next free aux var).
+    """
+    k = len(lits)
+    if k < 2:
+        return [], next_aux
+
+    s = list(range(next_aux, next_aux + k - 1))
+    clauses = [[-lits[0], s[0]]]
+    for i in range(1, k - 1):
+        clauses.append([-lits[i], s[i]])
+        clauses.append([-s[i - 1], s[i]])
+        clauses.append([-lits[i], -s[i - 1]])
+    clauses.append([-lits[k - 1], -s[k - 2]])
+
+    return clauses, next_aux + k - 1
 
 
 def to_cnf(input_path: str) -> Tuple[Iterable[Iterable[int]], int]:
@@ -28,7 +52,8 @@ def to_cnf(input_path: str) -> Tuple[Iterable[Iterable[int]], int]:
     Read puzzle from input_path and return (clauses, num_vars).
 
     - clauses: iterable of iterables of ints (each clause), no trailing 0s
-    - num_vars: must be N^3 with N = grid size
+    - num_vars: N^3 with N = grid size, plus the auxiliary variables of the
+      at-most-one encodings (numbered from N^3 + 1)
     """
     with open(input_path, "r") as f:
         text = [line.strip().split() for line in f]
@@ -36,72 +61,78 @@ def to_cnf(input_path: str) -> Tuple[Iterable[Iterable[int]], int]:
     N = len(text)
 
     clauses = []
-    num_vars = N*N*N
+    aux_counter = N*N*N + 1
     
     
 
-    def var(r, c, v):
-        return r * N * N + c * N + v
-        
+    # var(r, c, v) = r*N*N + c*N + v is inlined below: each loop computes the
+    # part that doesn't change in its inner loop once, as base
+    NN = N*N
+
     # each cell has one value
     for r in range(N):
         for c in range(N):
+            base = r*NN + c*N
+            cell = [base + v for v in range(1, N+1)]
+
             # each cell has at least one value
-            clauses.append([var(r, c, v) for v in range(1, 10)])
+            clauses.append(cell)
             
             # Each cell has at most one value
-            for v1 in range(1, N+1):
-                for v2 in range(v1 + 1, N+1):
-                    clauses.append([-var(r, c, v1), -var(r, c, v2)])
+            amo, aux_counter = amo_seq(cell, aux_counter)
+            clauses.extend(amo)
 
     # each row one v
     for r in range(N):
         for v in range(1,N+1):
+            base = r*NN + v
+            row = [base + c*N for c in range(N)]
+
             # for every col at least one V
-            clauses.append([var(r, c, v) for c in range(N)])
+            clauses.append(row)
             
             # each v is at most in one column
-            for c1 in range(N):
-                for c2 in range(c1 + 1, N):
-                    clauses.append([-var(r, c1, v), -var(r, c2, v)])
+            amo, aux_counter = amo_seq(row, aux_counter)
+            clauses.extend(amo)
             
     # each cell has one value
     for c in range(N):
         for v in range(1,N+1):
+            base = c*N + v
+            col = [base + r*NN for r in range(N)]
+
             # for every v at least one column
-            clauses.append([var(r, c, v) for r in range(N)])
+            clauses.append(col)
             
             # each v is at most in one column
-            for r1 in range(N):
-                for r2 in range(r1 + 1, N):
-                    clauses.append([-var(r1, c, v), -var(r2, c, v)])
+            amo, aux_counter = amo_seq(col, aux_counter)
+            clauses.extend(amo)
            
          
          
-    print(len(clauses))
+    if DEBUG:
+        print(len(clauses))
     boxdim = int(N**0.5)
              
     # boxes
     for row_offset in range(0, N, boxdim):
         for col_offset in range(0, N, boxdim):
-            print("new box")
+            if DEBUG:
+                print("new box")
 
             for v in range(1, N+1):
                 box = []
 
                 for i in range(boxdim):
+                    base = (i+row_offset)*NN + col_offset*N + v
                     for j in range (boxdim):
-                        r = i+row_offset
-                        c = j+col_offset
-                        box.append(var(r,c,v))   
+                        box.append(base + j*N)
                 # at least one
                 clauses.append(box)
                 
                 # at most one
-                for loop1 in range(len(box)):
-                    for loop2 in range(loop1+1, len(box)):
-                        
-                        clauses.append([-box[loop1], -box[loop2]])
+                amo, aux_counter = amo_seq(box, aux_counter)
+                clauses.extend(amo)
 
 
     #  Non-consecutive rule:
@@ -110,29 +141,35 @@ def to_cnf(input_path: str) -> Tuple[Iterable[Iterable[int]], int]:
 
     for i in range(N):
         for j in range(N):
+            base = i*NN + j*N
+            # var(i+1, j, .) and var(i, j+1, .) without the value
+            below = base + NN
+            right = base + N
             for v in range(1, N+1):
                 
                 # check for right border
                 if i+1 < N:
                     # for 0 and value N of v checks
                     if v+1 <= N:
-                        clauses.append([-var(i, j, v), -var(i+1, j, v+1)])
+                        clauses.append([-(base + v), -(below + v+1)])
                     if v-1 >= 1:
-                        clauses.append([-var(i, j, v), -var(i+1, j, v-1)])
+                        clauses.append([-(base + v), -(below + v-1)])
                         
                 # check for down border
                 if j+1 < N:
                     if v+1 <= N:
-                        clauses.append([-var(i, j, v), -var(i, j+1, v+1)])
+                        clauses.append([-(base + v), -(right + v+1)])
                     if v-1 >= 1:
-                        clauses.append([-var(i, j, v), -var(i, j+1, v-1)])
+                        clauses.append([-(base + v), -(right + v-1)])
                         
     for i in range (N):
         for j in range(N):
             text_int = text[i][j]            
             text_int = int(text_int)
             if text_int > 0:
-                clauses.append([var(i, j, text_int)])
+                clauses.append([i*NN + j*N + text_int])
+
+    num_vars = aux_counter - 1
     return clauses, num_vars
 
 
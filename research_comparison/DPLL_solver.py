@@ -1,108 +1,416 @@
+import heapq
 import time
 import sys
-from collections import Counter
-from typing import Iterable, List, Optional, Tuple
+from bisect import bisect_left
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+VSIDS_DECAY = 0.95
+VSIDS_RESCALE = 1e100
+REDUCE_INTERVAL = 2000  # conflicts between reductions of the learnt clause database
 
 
 def solve_cnf(clauses: Iterable[Iterable[int]], num_vars: int) -> Tuple[str, Optional[List[List[int]]]]:
-    clauses = [set(cl) for cl in clauses]
-    literal_counts = Counter(l for cl in clauses for l in cl)
-    stats = {"calls": 0}
+    clauses, fixed = preprocess(clauses, num_vars)
+    if clauses is None:
+        print()
+        return "UNSAT", None
+    # Literals fixed by preprocessing go back in as unit clauses
+    clauses = [[lit] for lit in fixed] + [list(cl) for cl in clauses]
+    stats = {"calls": 0, "conflicts": 0}
     start_time = time.time()
 
-    sat, model_assignment = dpll(clauses, [0] * (num_vars + 1), literal_counts, stats, start_time, num_vars)
+    # Two watched literals: every clause of length >= 2 watches cl[0] and cl[1]
+    watches: Dict[int, List[int]] = {lit: [] for v in range(1, num_vars + 1) for lit in (v, -v)}
+    state = {
+        "assignment": [0] * (num_vars + 1),
+        "level": [0] * (num_vars + 1),
+        # clause index that propagated each variable, -1 for decisions and level-0 units
+        "reason": [-1] * (num_vars + 1),
+        "trail": [],
+        # trail length at the start of each decision level
+        "trail_lim": [],
+        # scratch marks for conflict analysis, cleared again after every use
+        "seen": [False] * (num_vars + 1),
+    }
+    vsids = {
+        "activity": np.zeros(num_vars + 1, np.float64),
+        "bump": 1.0,
+        # min-heap of (-activity, var); stale and assigned entries are skipped on pop
+        "heap": [(0.0, v) for v in range(1, num_vars + 1)],
+        # whether the heap holds an entry with the variable's current activity
+        "in_heap": [False] + [True] * num_vars,
+    }
+    # learnt clause index -> LBD (number of distinct decision levels in it)
+    learnts: Dict[int, int] = {}
+    sat = True
+
+    for ci, cl in enumerate(clauses):
+        if not cl:
+            sat = False
+        elif len(cl) == 1:
+            lit = cl[0]
+            if value(state["assignment"], lit) == -1:
+                sat = False
+            elif value(state["assignment"], lit) == 0:
+                assign(state, lit, -1)
+        else:
+            watches[cl[0]].append(ci)
+            watches[cl[1]].append(ci)
+
+    if sat:
+        sat = dpll(clauses, watches, learnts, state, vsids, stats, start_time, num_vars)
+
+    model_assignment = state["assignment"]
+    for i in range(1, num_vars + 1):
+        if model_assignment[i] == 0:
+            model_assignment[i] = -1
 
     print()
 
     if sat:
         # convert model to Sudoku grid
-        grid = [[0]*9 for _ in range(9)]
-        for var_index in range(1, num_vars + 1):
-            val = model_assignment[var_index]
-            if val == 1:  
-                # Decode variable back to row, col, digit
-                var = var_index - 1
-                row = var // 81
-                col = (var % 81) // 9
-                digit = (var % 9) + 1
-                grid[row][col] = digit
-        return "SAT", grid
+        N = grid_size(num_vars)
+        # Only the first N^3 variables are cells; the rest are AMO auxiliaries
+        pos = np.flatnonzero(np.asarray(model_assignment[1:N**3 + 1]) == 1)
+        row, rem = np.divmod(pos, N * N)
+        col, digit = np.divmod(rem, N)
+        grid = np.zeros((N, N), np.int16)
+        grid[row, col] = digit + 1
+        return "SAT", grid.tolist()
     else:
         return "UNSAT", None
 
 
+def grid_size(num_vars: int) -> int:
+    """
+    Recover N from num_vars: either N^3 cell variables alone, or followed by
+    the 4 * N^2 * (N - 1) auxiliaries of the sequential at-most-one encoding.
+    """
+    N = round(num_vars ** (1 / 3))
+    if N ** 3 == num_vars:
+        return N
 
-def dpll(clauses: List[set],
-         assignment: List[int],
-         literal_counts: Counter,
-         stats: dict,
-         start_time: float,
-         num_vars: int) -> Tuple[bool, Optional[List[int]]]:
+    N = 1
+    while N ** 3 + 4 * N * N * (N - 1) < num_vars:
+        N += 1
+    return N
+
+
+def preprocess(clauses: Iterable[Iterable[int]], num_vars: int) -> Tuple[Optional[List[Tuple[int, ...]]], List[int]]:
+    """
+    Simplify the formula before search, repeated until nothing changes:
+      (a) pure literals (one polarity only) are set true,
+      (b) unit clauses are propagated,
+      (c) duplicate clauses and clauses containing a shorter kept clause of
+          length <= 2 are dropped (subsumption).
+    Clauses are kept as sorted tuples of distinct literals, which are far
+    smaller than sets and can be looked up with bisect.
+    Returns (remaining clauses, literals fixed true), or (None, fixed) when a
+    clause becomes empty.
+    """
+    clauses = [tuple(sorted(set(cl))) for cl in clauses]
+    alive = [True] * len(clauses)
+    occurs: Dict[int, List[int]] = {lit: [] for v in range(1, num_vars + 1) for lit in (v, -v)}
+    for ci, cl in enumerate(clauses):
+        for lit in cl:
+            occurs[lit].append(ci)
+    # number of alive clauses each literal occurs in
+    counts = {lit: len(cis) for lit, cis in occurs.items()}
+    assignment = [0] * (num_vars + 1)
+    fixed: List[int] = []
+
+    def drop(ci):
+        alive[ci] = False
+        for lit in clauses[ci]:
+            counts[lit] -= 1
+            # -lit just became pure
+            if counts[lit] == 0 and counts[-lit] > 0 and assignment[abs(lit)] == 0:
+                queue.append(-lit)
+
+    queue = [cl[0] for cl in clauses if len(cl) == 1]
+    queue += [lit for lit, n in counts.items() if n > 0 and counts[-lit] == 0]
+
+    while True:
+        # (a) + (b): make every queued literal true
+        while queue:
+            lit = queue.pop()
+            var, val = abs(lit), 1 if lit > 0 else -1
+            if assignment[var] == -val:
+                return None, fixed
+            if assignment[var] == val:
+                continue
+            assignment[var] = val
+            fixed.append(lit)
 
-    # Unit propagation
-    clauses = [set(cl) for cl in clauses]
-    assignment = assignment[:]
-    unit_queue = [next(iter(cl)) for cl in clauses if len(cl) == 1]
+            for ci in occurs[lit]:
+                if alive[ci]:
+                    drop(ci)
+            for ci in occurs[-lit]:
+                if alive[ci]:
+                    cl = clauses[ci]
+                    i = bisect_left(cl, -lit)
+                    cl = clauses[ci] = cl[:i] + cl[i + 1:]
+                    counts[-lit] -= 1
+                    if not cl:
+                        return None, fixed
+                    if len(cl) == 1:
+                        queue.append(cl[0])
 
-    while unit_queue:
-        lit = unit_queue.pop()
-        var, val = abs(lit), 1 if lit > 0 else -1
+        # (c) subsumption, shortest clauses first; sorted pairs of a sorted
+        # clause are directly comparable with the kept binary clauses
+        kept = set()
+        for ci in sorted((ci for ci in range(len(clauses)) if alive[ci]), key=lambda ci: len(clauses[ci])):
+            cl = clauses[ci]
+            if cl in kept or (len(cl) > 2 and any(pair in kept for pair in combinations(cl, 2))):
+                drop(ci)
+            else:
+                kept.add(cl)
 
-        if assignment[var] == -val:
-            return False, None
-        if assignment[var] == val:
+        # Dropping subsumed clauses can leave new pure literals behind
+        if not queue:
+            break
+
+    return [clauses[ci] for ci in range(len(clauses)) if alive[ci]], fixed
+
+
+def value(assignment: List[int], lit: int) -> int:
+    """1 if lit is true, -1 if false, 0 if unassigned."""
+    return assignment[lit] if lit > 0 else -assignment[-lit]
+
+
+def assign(state: dict, lit: int, reason: int) -> None:
+    var = abs(lit)
+    state["assignment"][var] = 1 if lit > 0 else -1
+    state["level"][var] = len(state["trail_lim"])
+    state["reason"][var] = reason
+    state["trail"].append(lit)
+
+
+def backjump(state: dict, vsids: dict, level: int) -> None:
+    """Unassign every decision level above level and put the variables back in the VSIDS heap."""
+    assignment, trail, trail_lim = state["assignment"], state["trail"], state["trail_lim"]
+    activity, heap, in_heap = vsids["activity"], vsids["heap"], vsids["in_heap"]
+    if level >= len(trail_lim):
+        return
+
+    mark = trail_lim[level]
+    for lit in trail[mark:]:
+        var = abs(lit)
+        assignment[var] = 0
+        # Propagated variables never left the heap, only popped ones need a new entry
+        if not in_heap[var]:
+            heapq.heappush(heap, (-activity[var], var))
+            in_heap[var] = True
+    del trail[mark:]
+    del trail_lim[level:]
+
+
+def bump_activity(vsids: dict, lits: Iterable[int]) -> None:
+    """Bump the variables involved in a conflict, then decay all others by growing the bump."""
+    activity, heap, in_heap, bump = vsids["activity"], vsids["heap"], vsids["in_heap"], vsids["bump"]
+    for lit in lits:
+        var = abs(lit)
+        activity[var] += bump
+        heapq.heappush(heap, (-activity[var], var))
+        in_heap[var] = True
+    bump /= VSIDS_DECAY
+
+    if bump > VSIDS_RESCALE:
+        activity /= VSIDS_RESCALE
+        bump /= VSIDS_RESCALE
+        heap[:] = [(-activity[v], v) for v in range(1, len(activity))]
+        heapq.heapify(heap)
+        in_heap[1:] = [True] * (len(activity) - 1)
+    vsids["bump"] = bump
+
+
+def pick_branch_var(vsids: dict, assignment: List[int]) -> int:
+    """Unassigned variable with the highest activity, or 0 if all are assigned."""
+    activity, heap, in_heap = vsids["activity"], vsids["heap"], vsids["in_heap"]
+    while heap:
+        neg_act, var = heapq.heappop(heap)
+        if -neg_act != activity[var]:
             continue
+        in_heap[var] = False
+        if assignment[var] == 0:
+            return var
+    return 0
+
 
-        assignment[var] = val
-        new_clauses = []
-
-        for cl in clauses:
-            if lit in cl:
-                continue 
-            if -lit in cl:
-                cl = cl - {-lit}
-                if not cl:
-                    return False, None
-                if len(cl) == 1:
-                    unit_queue.append(next(iter(cl)))
-            new_clauses.append(cl)
-        clauses = new_clauses
-
-    if not clauses:
-        model = assignment[:]
-        for i in range(1, num_vars + 1):
-            if model[i] == 0:
-                model[i] = -1
-        return True, model
-
-    # Choose branching variable using simple heuristic
-    unassigned_vars = [i for i in range(1, num_vars + 1) if assignment[i] == 0]
-    if not unassigned_vars:
-        return False, None
-
-    var = max(unassigned_vars, key=lambda v: literal_counts.get(v, 0) + literal_counts.get(-v, 0))
-
-    for val in (1, -1):
-        target_lit, opp_lit = var if val > 0 else -var, -var if val > 0 else var
-        new_clauses = []
-        conflict = False
-        for cl in clauses:
-            if target_lit in cl:
+def propagate(clauses: List[List[int]],
+              watches: Dict[int, List[int]],
+              state: dict,
+              head: int) -> Optional[int]:
+    """
+    Unit propagation over the watched literals of every trail entry from head on.
+    Returns the index of a conflicting clause, or None.
+    """
+    assignment, trail = state["assignment"], state["trail"]
+
+    while head < len(trail):
+        false_lit = -trail[head]
+        head += 1
+        watching = watches[false_lit]
+
+        i = 0
+        while i < len(watching):
+            ci = watching[i]
+            cl = clauses[ci]
+            # Keep the falsified watch in position 1
+            if cl[0] == false_lit:
+                cl[0], cl[1] = cl[1], false_lit
+            other = cl[0]
+            if value(assignment, other) == 1:
+                i += 1
                 continue
-            if opp_lit in cl:
-                cl = cl - {opp_lit}
-                if not cl:
-                    conflict = True
+
+            # Look for a new literal to watch
+            for k in range(2, len(cl)):
+                lit = cl[k]
+                if value(assignment, lit) != -1:
+                    cl[1], cl[k] = lit, false_lit
+                    watches[lit].append(ci)
+                    watching[i] = watching[-1]
+                    watching.pop()
                     break
-            new_clauses.append(cl)
-        if conflict:
-            continue
+            else:
+                # Clause is unit or conflicting
+                if value(assignment, other) == -1:
+                    return ci
+                assign(state, other, ci)
+                i += 1
+
+    return None
+
+
+def analyze(clauses: List[List[int]], state: dict, vsids: dict, conflict: int) -> Tuple[List[int], int, int]:
+    """
+    1-UIP conflict analysis.
+
+    Resolves the conflict clause with the reasons of the current-level literals,
+    walking the trail backwards, until a single current-level literal (the UIP)
+    remains. Returns (learnt clause with the negated UIP first and the literal
+    of the backjump level second, backjump level, LBD).
+    """
+    level, reason, trail, seen = state["level"], state["reason"], state["trail"], state["seen"]
+    current = len(state["trail_lim"])
+
+    seen_vars = []
+    learnt = [0]
+    counter = 0
+    idx = len(trail) - 1
+    cl = clauses[conflict]
+
+    while True:
+        for lit in cl:
+            var = abs(lit)
+            if not seen[var] and level[var] > 0:
+                seen[var] = True
+                seen_vars.append(var)
+                if level[var] == current:
+                    counter += 1
+                else:
+                    learnt.append(lit)
+
+        # Next literal on the trail that takes part in the conflict
+        while not seen[abs(trail[idx])]:
+            idx -= 1
+        uip = trail[idx]
+        idx -= 1
+        counter -= 1
+        if counter == 0:
+            break
+        cl = clauses[reason[abs(uip)]]
+
+    learnt[0] = -uip
+    bump_activity(vsids, seen_vars)
+    for var in seen_vars:
+        seen[var] = False
+
+    if len(learnt) == 1:
+        return learnt, 0, 1
+
+    # Watch the highest-level remaining literal so the clause is unit after the backjump
+    top = max(range(1, len(learnt)), key=lambda k: level[abs(learnt[k])])
+    learnt[1], learnt[top] = learnt[top], learnt[1]
+    lbd = len({level[abs(lit)] for lit in learnt})
+
+    return learnt, level[abs(learnt[1])], lbd
 
-        new_assignment = assignment[:]
-        new_assignment[var] = val
 
-        sat, model = dpll(new_clauses, new_assignment, literal_counts, stats, start_time, num_vars)
-        if sat:
-            return True, model
+def reduce_db(clauses: List[List[int]], watches: Dict[int, List[int]], learnts: Dict[int, int], state: dict) -> None:
+    """
+    Drop the worse half of the learnt clauses by LBD. Glue clauses (LBD <= 2)
+    and clauses that are currently the reason of an assignment are kept.
+    """
+    assignment, reason = state["assignment"], state["reason"]
+
+    def locked(ci):
+        var = abs(clauses[ci][0])
+        return assignment[var] != 0 and reason[var] == ci
+
+    candidates = sorted((ci for ci, lbd in learnts.items() if lbd > 2 and not locked(ci)),
+                        key=lambda ci: learnts[ci], reverse=True)
+    removed = set(candidates[:len(candidates) // 2])
+    if not removed:
+        return
+
+    for ci in removed:
+        clauses[ci] = None
+        del learnts[ci]
+    for lit, watching in watches.items():
+        watching[:] = [ci for ci in watching if ci not in removed]
+
+
+def dpll(clauses: List[List[int]],
+         watches: Dict[int, List[int]],
+         learnts: Dict[int, int],
+         state: dict,
+         vsids: dict,
+         stats: dict,
+         start_time: float,
+         num_vars: int) -> bool:
+    """
+    CDCL search: propagate, learn a 1-UIP clause on conflict and backjump
+    non-chronologically, otherwise decide on the most active variable.
+    """
+    assignment, trail, trail_lim = state["assignment"], state["trail"], state["trail_lim"]
+    head = 0
+
+    while True:
+        conflict = propagate(clauses, watches, state, head)
+        head = len(trail)
+
+        if conflict is not None:
+            stats["conflicts"] += 1
+            if not trail_lim:
+                return False
+
+            learnt, bt_level, lbd = analyze(clauses, state, vsids, conflict)
+            backjump(state, vsids, bt_level)
+            head = len(trail)
+
+            if len(learnt) == 1:
+                assign(state, learnt[0], -1)
+            else:
+                ci = len(clauses)
+                clauses.append(learnt)
+                watches[learnt[0]].append(ci)
+                watches[learnt[1]].append(ci)
+                learnts[ci] = lbd
+                assign(state, learnt[0], ci)
+
+            if stats["conflicts"] % REDUCE_INTERVAL == 0:
+                reduce_db(clauses, watches, learnts, state)
+            continue
+
+        var = pick_branch_var(vsids, assignment)
+        if var == 0:
+            return True
 
-    return False, None
+        stats["calls"] += 1
+        trail_lim.append(len(trail))
+        assign(state, var, -1)
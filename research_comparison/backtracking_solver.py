@@ -5,77 +5,176 @@ with added non-consecutive constraint
 """
 
 
-# Function to check if it is safe to place num at mat[row][col]
-def isSafe(mat, row, col, num):
-    N = len(mat)
-    B = int(N ** 0.5)
-    
-    # Check if num exists in the row
-    for x in range(N):
-        if mat[row][x] == num:
-            return False
-
-    # Check if num exists in the col
-    for x in range(N):
-        if mat[x][col] == num:
-            return False
-
-    # Check if num exists in the BxB sub-matrix
-    startRow = row - (row % B)
-    startCol = col - (col % B)
-
-    for i in range(B):
-        for j in range(B):
-            if mat[i + startRow][j + startCol] == num:
+import numpy as np
+from numba import njit
+
+
+# The grid is an (N, N) ndarray and values are kept as int64 bitmasks:
+# bit v is set when value v is taken in a row, column or box (bit 0 is
+# unused), and forbid[r, c] has bits v-1 and v+1 set for every value v
+# placed orthogonally next to (r, c). Everything below the Python wrapper solveSudoku is compiled
+# with numba, so N and B are passed in instead of derived from len(mat).
+
+
+@njit(cache=True)
+def boxIndex(row, col, B):
+    return (row // B) * B + col // B
+
+
+@njit(cache=True)
+def popcount(x):
+    count = 0
+    while x:
+        x &= x - 1
+        count += 1
+    return count
+
+
+# Function to get the bitmask of values that can still go in mat[row, col]
+@njit(cache=True)
+def candidates(row_used, col_used, box_used, forbid, row, col, N, B):
+    used = row_used[row] | col_used[col] | box_used[boxIndex(row, col, B)] | forbid[row, col]
+    full = ((np.int64(1) << N) - 1) << 1
+    return ~used & full
+
+
+# Function to check if it is safe to place num at mat[row, col]
+@njit(cache=True)
+def isSafe(row_used, col_used, box_used, forbid, row, col, num, N, B):
+    return (candidates(row_used, col_used, box_used, forbid, row, col, N, B) >> num) & 1 == 1
+
+
+# Function to place num at mat[row, col]. The forbid masks of the four
+# neighbors are saved first, because OR-ing in num-1 and num+1 cannot be
+# undone by clearing bits that another neighbor may also have set.
+@njit(cache=True)
+def place(mat, row_used, col_used, box_used, forbid, saved, row, col, num, N, B):
+    bit = np.int64(1) << num
+    mat[row, col] = num
+    row_used[row] |= bit
+    col_used[col] |= bit
+    box_used[boxIndex(row, col, B)] |= bit
+
+    # Non-consecutive constraint: orthogonal neighbors can't take num-1 or num+1
+    adjacent = (np.int64(1) << (num - 1)) | (np.int64(1) << (num + 1))
+    k = 0
+    for r, c in ((row, col - 1), (row, col + 1), (row - 1, col), (row + 1, col)):
+        if 0 <= r < N and 0 <= c < N:
+            saved[k] = forbid[r, c]
+            forbid[r, c] |= adjacent
+        k += 1
+
+
+@njit(cache=True)
+def remove(mat, row_used, col_used, box_used, forbid, saved, row, col, num, N, B):
+    bit = ~(np.int64(1) << num)
+    mat[row, col] = 0
+    row_used[row] &= bit
+    col_used[col] &= bit
+    box_used[boxIndex(row, col, B)] &= bit
+
+    k = 0
+    for r, c in ((row, col - 1), (row, col + 1), (row - 1, col), (row + 1, col)):
+        if 0 <= r < N and 0 <= c < N:
+            forbid[r, c] = saved[k]
+        k += 1
+
+
+# Function to pick the empty cell with the fewest candidates (MRV).
+# Returns (row, col, candidates), where candidates == 0 means a dead end,
+# or row == -1 when every cell is filled.
+@njit(cache=True)
+def selectCell(mat, row_used, col_used, box_used, forbid, N, B):
+    best_row, best_col, best_cand = -1, -1, np.int64(0)
+    best_count = N + 1
+    for row in range(N):
+        for col in range(N):
+            if mat[row, col] != 0:
+                continue
+            cand = candidates(row_used, col_used, box_used, forbid, row, col, N, B)
+            count = popcount(cand)
+            # An empty cell without candidates is a dead end
+            if count == 0:
+                return row, col, cand
+            if count < best_count:
+                best_row, best_col, best_cand, best_count = row, col, cand, count
+        if best_count == 1:
+            break
+
+    return best_row, best_col, best_cand
+
+# Function to solve the Sudoku problem, with an explicit stack of
+# (row, col, untried candidates, saved neighbor masks) for the cells filled so far
+@njit(cache=True)
+def solveSudokuRec(mat, row_used, col_used, box_used, forbid, N, B):
+    stack_row = np.empty(N * N, np.int64)
+    stack_col = np.empty(N * N, np.int64)
+    stack_cand = np.empty(N * N, np.int64)
+    stack_saved = np.empty((N * N, 4), np.int64)
+    depth = 0
+
+    row, col, cand = selectCell(mat, row_used, col_used, box_used, forbid, N, B)
+
+    while row != -1:
+        # Backtrack to the most recent cell that still has untried values
+        while cand == 0:
+            if depth == 0:
                 return False
-    
-    # Check non-consecutive constraint (orthogonal neighbors cannot differ by 1)
-    # Check left
-    if col > 0 and mat[row][col - 1] != 0 and abs(mat[row][col - 1] - num) == 1:
-        return False
-    # Check right
-    if col < N - 1 and mat[row][col + 1] != 0 and abs(mat[row][col + 1] - num) == 1:
-        return False
-    # Check up
-    if row > 0 and mat[row - 1][col] != 0 and abs(mat[row - 1][col] - num) == 1:
-        return False
-    # Check down
-    if row < N - 1 and mat[row + 1][col] != 0 and abs(mat[row + 1][col] - num) == 1:
-        return False
-
+            depth -= 1
+            row, col, cand = stack_row[depth], stack_col[depth], stack_cand[depth]
+            remove(mat, row_used, col_used, box_used, forbid, stack_saved[depth],
+                   row, col, np.int64(mat[row, col]), N, B)
+
+        bit = cand & -cand
+        cand ^= bit
+        num = 0
+        while bit > 1:
+            bit >>= 1
+            num += 1
+
+        place(mat, row_used, col_used, box_used, forbid, stack_saved[depth], row, col, num, N, B)
+        stack_row[depth], stack_col[depth], stack_cand[depth] = row, col, cand
+        depth += 1
+        row, col, cand = selectCell(mat, row_used, col_used, box_used, forbid, N, B)
+
+    # base case: every cell is filled
     return True
 
-# Function to solve the Sudoku problem
-def solveSudokuRec(mat, row, col):
-    N = len(mat)
-    
-    # base case: Reached Nth column of the last row
-    if row == N - 1 and col == N:
-        return True
-
-    # If last column of the row go to the next row
-    if col == N:
-        row += 1
-        col = 0
-
-    # If cell is already occupied then move forward
-    if mat[row][col] != 0:
-        return solveSudokuRec(mat, row, col + 1)
-
-    for num in range(1, N + 1):
-        
-        # If it is safe to place num at current position
-        if isSafe(mat, row, col, num):
-            mat[row][col] = num
-            if solveSudokuRec(mat, row, col + 1):
-                return True
-            mat[row][col] = 0
-
-    return False
+# Function to register the clues, rejecting clues that already break a constraint
+@njit(cache=True)
+def placeClues(mat, row_used, col_used, box_used, forbid, N, B):
+    # Clues are never removed, so their saved neighbor masks are not kept
+    saved = np.empty(4, np.int64)
+    for row in range(N):
+        for col in range(N):
+            num = np.int64(mat[row, col])
+            if num != 0:
+                if not isSafe(row_used, col_used, box_used, forbid, row, col, num, N, B):
+                    return False
+                place(mat, row_used, col_used, box_used, forbid, saved, row, col, num, N, B)
+    return True
 
 def solveSudoku(mat):
     """Solve Sudoku puzzle using backtracking. Returns True if solvable, False otherwise."""
-    return solveSudokuRec(mat, 0, 0)
+    N = len(mat)
+    B = int(N ** 0.5)
+    grid = np.array(mat, dtype=np.int16)
+    row_used = np.zeros(N, np.int64)
+    col_used = np.zeros(N, np.int64)
+    box_used = np.zeros(N, np.int64)
+    forbid = np.zeros((N, N), np.int64)
+
+    solved = (placeClues(grid, row_used, col_used, box_used, forbid, N, B)
+              and solveSudokuRec(grid, row_used, col_used, box_used, forbid, N, B))
+
+    # Write the (partial) solution back into the caller's lists
+    for row in range(N):
+        mat[row][:] = grid[row].tolist()
+    return solved
+
+def warmup():
+    """Compile (or load from cache) the njit functions by solving a 1x1 grid."""
+    solveSudoku([[0]])
 
 if __name__ == "__main__":
     mat = [
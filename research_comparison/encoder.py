@@ -19,8 +19,48 @@ You must encode:
 """
 
 
-from typing import Tuple, Iterable
+from functools import lru_cache
+from typing import List, Optional, Tuple, Iterable
 
+import numpy as np
+
+
+def amo_seq(groups: np.ndarray, next_aux: int, out: Optional[np.ndarray] = None) -> Tuple[np.ndarray, int]:
+    """
+    Sequential (Sinz) at-most-one over every row of groups (shape (g, k)).
+
+    Each group gets k-1 auxiliary variables s_1..s_{k-1}, numbered from
+    next_aux, where s_i means "one of x_1..x_i is true". The g*(3k-4)
+    binary clauses are written into out (allocated if not given).
+    Returns (clauses as a (m, 2) array, next free aux var).
+    """
+    g, k = groups.shape
+    if k < 2:
+        return np.empty((0, 2), dtype=groups.dtype), next_aux
+    if out is None:
+        out = np.empty((g * (3 * k - 4), 2), dtype=groups.dtype)
+
+    s = np.arange(next_aux, next_aux + g * (k - 1), dtype=groups.dtype).reshape(g, k - 1)
+    x = groups
+    n = g * (k - 2)
+
+    # (-x_1 v s_1)
+    out[:g, 0] = -x[:, 0]
+    out[:g, 1] = s[:, 0]
+    # (-x_i v s_i), 1 < i < k
+    out[g:g + n, 0] = -x[:, 1:-1].ravel()
+    out[g:g + n, 1] = s[:, 1:].ravel()
+    # (-s_{i-1} v s_i), 1 < i < k
+    out[g + n:g + 2 * n, 0] = -s[:, :-1].ravel()
+    out[g + n:g + 2 * n, 1] = s[:, 1:].ravel()
+    # (-x_i v -s_{i-1}), 1 < i < k
+    out[g + 2 * n:g + 3 * n, 0] = -x[:, 1:-1].ravel()
+    out[g + 2 * n:g + 3 * n, 1] = -s[:, :-1].ravel()
+    # (-x_k v -s_{k-1})
+    out[g + 3 * n:, 0] = -x[:, -1]
+    out[g + 3 * n:, 1] = -s[:, -1]
+
+    return out, next_aux + g * (k - 1)
 
 
 def to_cnf(input_path: str) -> Tuple[Iterable[Iterable[int]], int]:
@@ -28,96 +68,83 @@ def to_cnf(input_path: str) -> Tuple[Iterable[Iterable[int]], int]:
     Read puzzle from input_path and return (clauses, num_vars).
 
     - clauses: iterable of iterables of ints (each clause), no trailing 0s
-    - num_vars: must be N^3 with N = grid size
+    - num_vars: N^3 with N = grid size, plus the auxiliary variables of the
+      at-most-one encodings (numbered from N^3 + 1)
     """
 
     with open(input_path) as f:
         text = [line.strip().split() for line in f]
 
     N = len(text)
+
+    # (1)-(5) only depend on N, so they are shared by every puzzle of that size
+    structural, num_vars = _structural_cnf(N)
+
+    clauses = list(structural)
+    clauses.extend(_clue_clauses(text, N))
+
+    return clauses, num_vars
+
+
+@lru_cache(maxsize=None)
+def _structural_cnf(N: int) -> Tuple[Tuple[Tuple[int, ...], ...], int]:
+    """Constraints (1)-(5) for an N x N grid as (clauses, num_vars)."""
     B = int(N**0.5)
 
     clauses = []
 
-    def var(r, c, v):
-        return r * N * N + c * N + v
-    
-    num_vars = N * N * N
+    # V[r, c, v - 1] == var(r, c, v) = r*N*N + c*N + v
+    V = np.arange(1, N**3 + 1, dtype=np.int32).reshape(N, N, N)
+
+    groups = [
+        # (1) Exactly one value per cell
+        V.reshape(N * N, N),
+        # (2) Exactly one column per value in each row
+        V.transpose(0, 2, 1).reshape(N * N, N),
+        # (3) Exactly one row per value in each column
+        V.transpose(1, 2, 0).reshape(N * N, N),
+        # (4) Exactly one cell per value in each sqrt(N) by sqrt(N) box
+        V.reshape(B, B, B, B, N).transpose(0, 2, 4, 1, 3).reshape(N * N, N),
+    ]
+
+    # All at-most-one clauses go into one preallocated int32 buffer:
+    # 4 constraint kinds x N*N groups x (3N - 4) binary clauses each.
+    per_kind = N * N * max(3 * N - 4, 0)
+    amo = np.empty((len(groups) * per_kind, 2), dtype=np.int32)
+
+    aux_counter = N * N * N + 1
+    for i, group in enumerate(groups):
+        # At least one
+        clauses.extend(group.tolist())
+        # At most one
+        _, aux_counter = amo_seq(group, aux_counter, amo[i * per_kind:(i + 1) * per_kind])
+    clauses.extend(amo.tolist())
 
-    # (1) Exactly one value per cell
-    for r in range(N):
-        for c in range(N):
-            # At least one value in cell
-            clauses.append([var(r, c, v) for v in range(1, N + 1)])
-            # At most one value in cell
-            for v1 in range(1, N + 1):
-                for v2 in range(v1 + 1, N + 1):
-                    clauses.append([-var(r, c, v1), -var(r, c, v2)])
-            
-    # (2) Exactly one row per value in each row
-    for r in range(N):
-        for v in range(1, N + 1):
-            # At least one column for value v in row r
-            clauses.append([var(r, c, v) for c in range(N)])
-            # At most one column for value v in row r
-            for c1 in range(N):
-                for c2 in range(c1 + 1, N):
-                    clauses.append([-var(r, c1, v), -var(r, c2, v)])
-
-     # (3) Exactly one column per value in each column
-    for c in range(N):
-        for v in range(1, N + 1):
-            # At least one column for value v in row r
-            clauses.append([var(r, c, v) for r in range(N)])
-            # At most one column for value v in row r
-            for r1 in range(N):
-                for r2 in range(r1 + 1, N):
-                    clauses.append([-var(r1, c, v), -var(r2, c, v)])
-
-     # (4) Exactly one v in a sqrt(N) by sqrt(N) box
-    for r_box in range(0, N, B):
-        for c_box in range(0, N, B):
-            for v in range(1, N + 1):
-                vars_list = [
-                    var(r_box + i, c_box + j, v)
-                    for i in range(B)
-                    for j in range(B)
-                    
-                ]
-                # At least one v in the box
-                clauses.append(vars_list)
-                # At most one v in the box
-                for i1 in range(len(vars_list)):
-                    for i2 in range(i1 + 1, len(vars_list)):
-                        clauses.append([-vars_list[i1], -vars_list[i2]])
-    
     # (5) orthogonal cant be more exactly be abs|value(r,c) - value(r', c')| == 1
-    for r in range(0, N):
-        for c in range(0, N):
-            for v in range(1, N+1):
-                if c + 1 < N:
-                    if v < N:
-                        # Right and left
-                        clauses.append([-var(r, c, v), -var(r, c + 1, v + 1)])
-                    if v > 1:
-                        clauses.append([-var(r, c, v), -var(r, c + 1, v - 1)])
-
-                if r + 1 < N:
-                    if v < N:
-                        # Up and down
-                        clauses.append([-var(r, c, v), -var(r + 1, c, v + 1)])
-                    if v > 1:
-                        clauses.append([-var(r, c, v), -var(r + 1, c, v - 1)])
-
-    # (6) Unit clauses of a certain puzzle, so the values that are already filled in.
+    # Pair every cell with its right and lower neighbor, values v and v + 1 either way round
+    pairs = [
+        (V[:, :-1, :-1], V[:, 1:, 1:]),   # right neighbor has v + 1
+        (V[:, :-1, 1:], V[:, 1:, :-1]),   # right neighbor has v - 1
+        (V[:-1, :, :-1], V[1:, :, 1:]),   # lower neighbor has v + 1
+        (V[:-1, :, 1:], V[1:, :, :-1]),   # lower neighbor has v - 1
+    ]
+    for a, b in pairs:
+        clauses.extend(np.stack([-a.ravel(), -b.ravel()], axis=1).tolist())
+
+    num_vars = aux_counter - 1
+
+    return tuple(map(tuple, clauses)), num_vars
+
+
+def _clue_clauses(text: List[List[str]], N: int) -> List[List[int]]:
+    """(6) Unit clauses of a certain puzzle, so the values that are already filled in."""
+    clauses = []
 
     for r in range(N):
         for c in range(N):
             v = text[r][c]
             v = int(v)
             if v > 0:
-                clauses.append([var(r, c, v)])
-
-    return clauses, num_vars
-
+                clauses.append([r * N * N + c * N + v])
 
+    return clauses
@@ -21,10 +21,12 @@ import argparse
 import time
 import os
 import csv
+from pathlib import PurePath
+from multiprocessing import Pool
 from typing import Tuple, Iterable, List
 from encoder import to_cnf
 from DPLL_solver import solve_cnf
-from backtracking_solver import solveSudoku, isSafe
+from backtracking_solver import solveSudoku, isSafe, warmup
 
 
 def parse_args():
@@ -137,6 +139,11 @@ def compare_single_puzzle(input_path: str, verbose: bool = True):
     }
 
 
+def compare_single_puzzle_worker(input_path: str):
+    """Pool worker: compare both algorithms on one puzzle without printing."""
+    return compare_single_puzzle(input_path, verbose=False)
+
+
 def compare_batch(directory: str, verbose: bool = True):
     """Compare both algorithms on multiple puzzles in a directory."""
     if verbose:
@@ -192,59 +199,50 @@ def compare_batch(directory: str, verbose: bool = True):
     return results
 
 
+CSV_FIELDS = ['category', 'type', 'puzzle_file', 'dpll_status', 'dpll_time', 'bt_status', 'bt_time', 'agreement', 'faster_method', 'speedup']
+CATEGORIES = {"Trivial_Sudokus": "Trivial", "Simple_Sudokus": "Simple"}
+
+
+def result_to_row(result: dict) -> list:
+    """Turn a compare_single_puzzle result into a CSV row (see CSV_FIELDS)."""
+    # Extract category and type from file path
+    parts = PurePath(result['file']).parts
+    category = next((CATEGORIES[p] for p in parts if p in CATEGORIES), "Unknown")
+    puzzle_type = "Unknown"
+    if category != "Unknown":
+        puzzle_type = next((p for p in parts if p in ("SAT", "UNSAT")), "Unknown")
+    
+    dpll_time, bt_time = result['dpll_time'], result['bt_time']
+    faster_method = "N/A"
+    speedup = "N/A"
+    if dpll_time is not None and bt_time is not None:
+        if dpll_time < bt_time:
+            faster_method = "DPLL"
+            speedup = "%.2fx" % (bt_time / dpll_time)
+        else:
+            faster_method = "Backtracking"
+            speedup = "%.2fx" % (dpll_time / bt_time)
+    
+    return [
+        category,
+        puzzle_type,
+        parts[-1],
+        result['dpll_status'],
+        dpll_time if dpll_time is not None else "N/A",
+        result['bt_status'],
+        bt_time if bt_time is not None else "N/A",
+        result['dpll_status'] == result['bt_status'],
+        faster_method,
+        speedup
+    ]
+
+
 def save_results_to_csv(results: List[dict], output_file: str):
     """Save results to a CSV file."""
     with open(output_file, 'w', newline='') as csvfile:
-        fieldnames = ['category', 'type', 'puzzle_file', 'dpll_status', 'dpll_time', 'bt_status', 'bt_time', 'agreement', 'faster_method', 'speedup']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        writer.writeheader()
-        for result in results:
-            # Extract category and type from file path
-            file_path = result['file']
-            path_parts = file_path.split(os.sep)
-            
-            category = "Unknown"
-            puzzle_type = "Unknown"
-            puzzle_file = os.path.basename(file_path)
-            
-            if "Trivial_Sudokus" in path_parts:
-                category = "Trivial"
-                if "SAT" in path_parts:
-                    puzzle_type = "SAT"
-                elif "UNSAT" in path_parts:
-                    puzzle_type = "UNSAT"
-            elif "Simple_Sudokus" in path_parts:
-                category = "Simple"
-                if "SAT" in path_parts:
-                    puzzle_type = "SAT"
-                elif "UNSAT" in path_parts:
-                    puzzle_type = "UNSAT"
-            
-            agreement = result['dpll_status'] == result['bt_status']
-            
-            faster_method = "N/A"
-            speedup = None
-            if result['dpll_time'] is not None and result['bt_time'] is not None:
-                if result['dpll_time'] < result['bt_time']:
-                    faster_method = "DPLL"
-                    speedup = result['bt_time'] / result['dpll_time']
-                else:
-                    faster_method = "Backtracking"
-                    speedup = result['dpll_time'] / result['bt_time']
-            
-            writer.writerow({
-                'category': category,
-                'type': puzzle_type,
-                'puzzle_file': puzzle_file,
-                'dpll_status': result['dpll_status'],
-                'dpll_time': f"{result['dpll_time']:.6f}" if result['dpll_time'] is not None else "N/A",
-                'bt_status': result['bt_status'],
-                'bt_time': f"{result['bt_time']:.6f}" if result['bt_time'] is not None else "N/A",
-                'agreement': agreement,
-                'faster_method': faster_method,
-                'speedup': f"{speedup:.2f}x" if speedup is not None else "N/A"
-            })
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_FIELDS)
+        writer.writerows(result_to_row(result) for result in results)
     
     print(f"\nResults saved to {output_file}")
 
@@ -265,17 +263,28 @@ def run_all_puzzles(output_file: str):
         "Simple_Sudokus/UNSAT"
     ]
     
+    puzzle_paths = []
     for directory in directories:
         if os.path.exists(directory):
-            print(f"\nProcessing {directory}...")
-            results = compare_batch(directory, verbose=False)
-            all_results.extend(results)
-            print(f"Completed {directory}: {len(results)} puzzles")
+            puzzle_files = sorted([f for f in os.listdir(directory) if f.endswith('.txt')])
+            puzzle_paths.extend(os.path.join(directory, f) for f in puzzle_files)
+            print(f"Found {len(puzzle_files)} puzzles in {directory}")
         else:
             print(f"Warning: Directory {directory} not found")
     
-    # Save to CSV
-    save_results_to_csv(all_results, output_file)
+    # Puzzles are independent, so solve them on all cores and write each
+    # CSV row as soon as its result comes back. Every worker compiles the
+    # backtracking solver up front, before it times its first puzzle.
+    print(f"\nProcessing {len(puzzle_paths)} puzzles...")
+    with open(output_file, 'w', newline='') as csvfile, Pool(initializer=warmup) as pool:
+        writer = csv.writer(csvfile)
+        writer.writerow(CSV_FIELDS)
+        for result in pool.imap_unordered(compare_single_puzzle_worker, puzzle_paths):
+            all_results.append(result)
+            writer.writerow(result_to_row(result))
+            csvfile.flush()
+    print(f"Completed {len(all_results)} puzzles")
+    print(f"\nResults saved to {output_file}")
     
     # Overall summary
     print(f"\n{'='*80}")
@@ -315,6 +324,8 @@ def run_all_puzzles(output_file: str):
 
 def main():
     args = parse_args()
+    # Compile the backtracking solver before anything is timed
+    warmup()
     
     if args.run_all:
         # Run all puzzles and save to CSV